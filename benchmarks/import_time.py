@@ -0,0 +1,77 @@
+"""Measures how long it takes a fresh interpreter to import postgisgeocoder's modules and fails
+(exit code 1) if an import exceeds its budget or pulls in a dependency that should load lazily.
+
+Run from the top-level directory of this repo via
+    python benchmarks/import_time.py [--runs 5]
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+from typing import Dict
+
+# Budgets (in seconds) for the best-of-n import time of each module in a fresh interpreter.
+# The submodule budgets leave a little headroom over pandas + SQLAlchemy, which they can't avoid
+# importing; pulling in any heavy dependency at import time should blow through them.
+IMPORT_TIME_BUDGETS = {
+    "postgisgeocoder": 0.05,
+    "postgisgeocoder.db": 0.5,
+    "postgisgeocoder.geocoding": 0.6,
+    "postgisgeocoder.profiling": 0.6,
+}
+# Heavy dependencies that must only be imported on first use.
+LAZY_MODULES = ["geopandas", "shapely", "tqdm", "yaml"]
+
+_IMPORT_TIMING_SCRIPT = """
+import json, sys, time
+start_time = time.perf_counter()
+import {module_name}
+run_time = time.perf_counter() - start_time
+print(json.dumps({{
+    "run_time": run_time,
+    "lazy_modules_loaded": [m for m in {lazy_modules!r} if m in sys.modules],
+}}))
+"""
+
+
+def time_import_in_fresh_interpreter(module_name: str) -> Dict:
+    repo_root_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    result = subprocess.run(
+        [
+            sys.executable,
+            "-c",
+            _IMPORT_TIMING_SCRIPT.format(module_name=module_name, lazy_modules=LAZY_MODULES),
+        ],
+        cwd=repo_root_dir,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    return json.loads(result.stdout)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--runs", type=int, default=5, help="imports to time per module")
+    args = parser.parse_args()
+
+    over_budget = False
+    for module_name, budget in IMPORT_TIME_BUDGETS.items():
+        timings = [time_import_in_fresh_interpreter(module_name) for _ in range(args.runs)]
+        best_run_time = min(timing["run_time"] for timing in timings)
+        lazy_modules_loaded = timings[0]["lazy_modules_loaded"]
+        status = "ok"
+        if best_run_time > budget or len(lazy_modules_loaded) > 0:
+            status = "FAIL"
+            over_budget = True
+        print(
+            f"{module_name:<28} {best_run_time:8.4f}s (budget {budget:.2f}s) {status}"
+            + (f"; eagerly imported: {lazy_modules_loaded}" if lazy_modules_loaded else "")
+        )
+    return 1 if over_budget else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
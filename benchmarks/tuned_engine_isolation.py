@@ -0,0 +1,76 @@
+"""Checks (against in-memory sqlite engines, so no database is needed) that tuned engines from
+postgisgeocoder.tuning.get_tuned_engine get their own connection pools and leave the caller's
+engine, pool, and connections untouched. Exits with code 1 if any check fails.
+
+Run from the top-level directory of this repo via
+    python benchmarks/tuned_engine_isolation.py
+"""
+
+import os
+import sys
+from typing import List
+
+from sqlalchemy import create_engine, text
+from sqlalchemy.exc import DBAPIError
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from postgisgeocoder.tuning import get_tuned_engine, register_tuning_profile  # noqa: E402
+
+
+def _connection_applies_session_settings(engine) -> bool:
+    # sqlite has no set_config(), so a connection that runs a profile's session settings fails.
+    try:
+        with engine.connect() as conn:
+            conn.execute(text("SELECT 1;"))
+    except DBAPIError:
+        return True
+    return False
+
+
+def check_tuned_engine_isolation(use_future_engine: bool) -> List[str]:
+    failures = []
+    # SQLAlchemy 2 only accepts future=True, and it's the default there.
+    engine = create_engine("sqlite://", **({"future": True} if use_future_engine else {}))
+    original_pool = engine.pool
+    first_tuned_engine = get_tuned_engine(engine=engine, profile_name="isolation_check_a")
+    first_tuned_pool = first_tuned_engine.pool
+    second_tuned_engine = get_tuned_engine(engine=engine, profile_name="isolation_check_b")
+
+    if engine.pool is not original_pool:
+        failures.append("get_tuned_engine replaced the caller's pool")
+    if first_tuned_engine.pool is engine.pool or second_tuned_engine.pool is engine.pool:
+        failures.append("a tuned engine shares the caller's pool")
+    if first_tuned_engine.pool is not first_tuned_pool:
+        failures.append("creating a second tuned engine replaced the first one's pool")
+    if first_tuned_engine.pool is second_tuned_engine.pool:
+        failures.append("tuned engines for different profiles share a pool")
+    if get_tuned_engine(engine=engine, profile_name="isolation_check_a") is not first_tuned_engine:
+        failures.append("tuned engines aren't cached per source engine and profile")
+    if _connection_applies_session_settings(engine):
+        failures.append("the caller's connections run the profile's session settings")
+    if not _connection_applies_session_settings(first_tuned_engine):
+        failures.append("the tuned engine's connections don't run the profile's session settings")
+
+    register_tuning_profile(name="isolation_check_a", session_settings={"work_mem": "1MB"})
+    if engine.pool is not original_pool or _connection_applies_session_settings(engine):
+        failures.append("register_tuning_profile disposed of or tuned the caller's pool")
+    return failures
+
+
+def main() -> int:
+    for profile_name in ["isolation_check_a", "isolation_check_b"]:
+        register_tuning_profile(name=profile_name, session_settings={"work_mem": "1MB"})
+    any_failed = False
+    for use_future_engine in [False, True]:
+        failures = check_tuned_engine_isolation(use_future_engine=use_future_engine)
+        any_failed = any_failed or len(failures) > 0
+        status = "ok" if len(failures) == 0 else "FAIL"
+        print(f"future={str(use_future_engine):<5} {status}")
+        for failure in failures:
+            print(f"    {failure}")
+    return 1 if any_failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -26,5 +26,6 @@ for DB in template_postgis "$POSTGRES_DB"; do
         CREATE EXTENSION IF NOT EXISTS postgis_tiger_geocoder;
         CREATE EXTENSION IF NOT EXISTS address_standardizer;
         CREATE EXTENSION IF NOT EXISTS address_standardizer_data_us;
+        CREATE EXTENSION IF NOT EXISTS pg_stat_statements;
 EOSQL
 done
\ No newline at end of file
@@ -315,6 +315,8 @@ main () {
   echo "working directory: $(pwd)"
   echo "$(ls -la)"
   format_tabblock_variables
+  # Record the TIGER vintage so geocoding results can be traced back to it
+  ${PSQL} -c "UPDATE tiger.loader_variables SET tiger_year = '${YEAR}';"
   echo '----------------------------------------'
   echo "      Adding US national data"
   echo '----------------------------------------'
@@ -1,3 +1,15 @@
-from postgisgeocoder import (
-    utils
-)
\ No newline at end of file
+import importlib
+
+# Submodules are imported on first attribute access (eg postgisgeocoder.geocoding) so that
+# importing the package itself stays cheap for short-lived workers.
+_SUBMODULES = ("db", "geocoding", "profiling", "queries", "tuning", "utils")
+
+
+def __getattr__(name: str):
+    if name in _SUBMODULES:
+        return importlib.import_module(f"postgisgeocoder.{name}")
+    raise AttributeError(f"module 'postgisgeocoder' has no attribute '{name}'")
+
+
+def __dir__():
+    return sorted(list(globals().keys()) + list(_SUBMODULES))
@@ -1,15 +1,17 @@
 import os
 from typing import Dict, List, Union
-import yaml
 
-import geopandas as gpd
 import pandas as pd
 from sqlalchemy import create_engine, inspect, text
 from sqlalchemy.engine.url import URL
 from sqlalchemy.engine.base import Engine
 from sqlalchemy.schema import CreateSchema
 
-from postgisgeocoder.utils import get_project_root_dir
+
+def get_project_root_dir() -> os.path:
+    root_dir = os.path.dirname(os.path.dirname(__file__))
+    assert os.path.basename(root_dir) == "postgis_geocoder"
+    return root_dir
 
 
 def get_connection_url_from_secrets() -> URL:
@@ -41,6 +43,8 @@ def get_engine_from_secrets(use_sqlalchemy_v2: bool = False, echo: bool = False)
 
 
 def get_connection_url_from_credentials_file(credential_path: os.path) -> URL:
+    import yaml
+
     with open(credential_path) as cred_file:
         credentials = yaml.load(cred_file, Loader=yaml.FullLoader)
 
@@ -77,6 +81,15 @@ def execute_structural_command(query: str, engine: Engine) -> None:
             conn.execute(text(query))
 
 
+def execute_row_count_returning_command(query: str, engine: Engine) -> int:
+    """Executes a data-modifying command in its own transaction and returns the number of rows
+    it affected."""
+    with engine.connect() as conn:
+        with conn.begin():
+            result = conn.execute(text(query))
+    return result.rowcount
+
+
 def get_data_schema_names(engine: Engine) -> List:
     insp = inspect(engine)
     return insp.get_schema_names()
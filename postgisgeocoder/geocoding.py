@@ -1,19 +1,29 @@
-from typing import Callable
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+import time
+from typing import TYPE_CHECKING, Callable, Dict, List, Optional, Tuple
 
-import geopandas as gpd
 import pandas as pd
-from sqlalchemy.engine.base import Engine
+from sqlalchemy import text
+from sqlalchemy.engine.base import Connection, Engine
 from sqlalchemy.dialects.postgresql import insert
-from tqdm import tqdm
+from sqlalchemy.exc import DBAPIError
 
 from postgisgeocoder.db import (
     execute_result_returning_query,
+    execute_row_count_returning_command,
     execute_structural_command,
     create_database_schema,
     get_srid_of_column,
+    get_table_column_details,
 )
+from postgisgeocoder.tuning import get_tuned_engine
 from postgisgeocoder.utils import decode_geom_valued_column_to_geometry_type
 
+if TYPE_CHECKING:
+    import geopandas as gpd
+    from tqdm import tqdm
+
 
 def create_user_data_schema(engine: Engine) -> None:
     create_database_schema(engine=engine, schema_name="user_data")
@@ -22,14 +32,98 @@ def create_user_data_schema(engine: Engine) -> None:
 def create_address_table(
     engine: Engine, schema_name: str = "user_data", table_name: str = "address_table"
 ) -> None:
+    """Creates an address table keyed on an integer surrogate key (address_id), which the batch
+    updates join on. full_address is kept unique through a unique index on its md5 hash, which
+    keeps index entries small regardless of address length. An existing table in the older
+    layout is migrated (see add_surrogate_key_to_address_table)."""
     execute_structural_command(
         query=f"""
             CREATE TABLE IF NOT EXISTS {schema_name}.{table_name} (
-                full_address varchar(100) PRIMARY KEY
+                address_id bigint GENERATED ALWAYS AS IDENTITY PRIMARY KEY,
+                full_address text NOT NULL
             );
         """,
         engine=engine,
     )
+    # The md5 index is created by the migration, after any varchar -> text change, so that
+    # it's never built on a legacy table only to be rebuilt by the type change.
+    add_surrogate_key_to_address_table(
+        engine=engine, schema_name=schema_name, table_name=table_name
+    )
+
+
+def add_surrogate_key_to_address_table(
+    engine: Engine, schema_name: str = "user_data", table_name: str = "address_table"
+) -> None:
+    """Migrates an address table created with full_address varchar(100) as its primary key to
+    the address_id-keyed layout of create_address_table. Each step is guarded by a catalog
+    check, so an already-migrated table gets no DDL (and no locks or index rebuilds) at all.
+
+    The unique md5(full_address) index requires full_address values to be unique. Tables that
+    never enforced that (eg user-created std_address_tables) must be deduplicated first; the
+    migration raises an error naming the table if they aren't."""
+    full_table_name = f"{schema_name}.{table_name}"
+    execute_structural_command(
+        query=f"""
+            DO $$
+            BEGIN
+                IF NOT EXISTS (
+                    SELECT 1
+                    FROM information_schema.columns
+                    WHERE table_schema = '{schema_name}'
+                    AND table_name = '{table_name}'
+                    AND column_name = 'address_id'
+                ) THEN
+                    ALTER TABLE {full_table_name}
+                        ADD COLUMN address_id bigint GENERATED ALWAYS AS IDENTITY;
+                END IF;
+                IF NOT EXISTS (
+                    SELECT 1
+                    FROM pg_constraint AS c
+                        INNER JOIN pg_attribute AS a
+                        ON a.attrelid = c.conrelid AND a.attnum = ANY(c.conkey)
+                    WHERE c.conrelid = '{full_table_name}'::regclass
+                    AND c.contype = 'p'
+                    AND a.attname = 'address_id'
+                ) THEN
+                    ALTER TABLE {full_table_name} DROP CONSTRAINT IF EXISTS {table_name}_pkey;
+                    ALTER TABLE {full_table_name} ADD PRIMARY KEY (address_id);
+                END IF;
+                IF EXISTS (
+                    SELECT 1
+                    FROM information_schema.columns
+                    WHERE table_schema = '{schema_name}'
+                    AND table_name = '{table_name}'
+                    AND column_name = 'full_address'
+                    AND data_type = 'character varying'
+                ) THEN
+                    ALTER TABLE {full_table_name} ALTER COLUMN full_address TYPE text;
+                END IF;
+                IF NOT EXISTS (
+                    SELECT 1
+                    FROM pg_indexes
+                    WHERE schemaname = '{schema_name}'
+                    AND indexname = '{table_name}_full_address_md5_idx'
+                ) THEN
+                    IF EXISTS (
+                        SELECT 1
+                        FROM {full_table_name}
+                        GROUP BY md5(full_address)
+                        HAVING COUNT(*) > 1
+                    ) THEN
+                        RAISE EXCEPTION
+                            '{full_table_name} has duplicate full_address values'
+                            USING HINT = 'Deduplicate full_address in {full_table_name} (keeping '
+                                || 'one row per address) and rerun; address_id-keyed tables '
+                                || 'require unique addresses.';
+                    END IF;
+                    CREATE UNIQUE INDEX {table_name}_full_address_md5_idx
+                        ON {full_table_name} (md5(full_address));
+                END IF;
+            END $$;
+        """,
+        engine=engine,
+    )
 
 
 def add_addr_normalization_columns_to_address_table(
@@ -55,18 +149,44 @@ def add_addr_normalization_columns_to_address_table(
     )
 
 
+def _add_missing_columns_to_table(
+    engine: Engine, schema_name: str, table_name: str, column_definitions: Dict[str, str]
+) -> None:
+    # ALTER TABLE takes an ACCESS EXCLUSIVE lock even if every column already exists, so it's
+    # only issued when the catalog shows a column is missing.
+    table_cols = get_table_column_details(
+        engine=engine, schema_name=schema_name, table_name=table_name
+    )["column_name"].to_list()
+    missing_cols = [col for col in column_definitions if col not in table_cols]
+    if len(missing_cols) == 0:
+        return
+    add_column_clauses = ",\n".join(
+        [f"ADD COLUMN IF NOT EXISTS {col} {column_definitions[col]}" for col in missing_cols]
+    )
+    execute_structural_command(
+        query=f"ALTER TABLE {schema_name}.{table_name} {add_column_clauses};", engine=engine
+    )
+
+
 def add_geocode_output_columns_to_address_table(
     engine: Engine, schema_name: str = "user_data", table_name: str = "address_table"
 ) -> None:
-    execute_structural_command(
-        query=f"""
-            ALTER TABLE {schema_name}.{table_name}
-                ADD COLUMN IF NOT EXISTS rating integer DEFAULT NULL,
-                ADD COLUMN IF NOT EXISTS norm_address varchar DEFAULT NULL,
-                ADD COLUMN IF NOT EXISTS geomout geometry(POINT,4269) DEFAULT NULL;
-        """,
+    """Adds any missing geocoding output columns (without any DDL or table lock if none are
+    missing) and records the currently loaded TIGER coverage, which the geocoding UPDATEs stamp
+    into tiger_coverage_id as they write each result."""
+    _add_missing_columns_to_table(
         engine=engine,
+        schema_name=schema_name,
+        table_name=table_name,
+        column_definitions={
+            "rating": "integer DEFAULT NULL",
+            "norm_address": "varchar DEFAULT NULL",
+            "geomout": "geometry(POINT,4269) DEFAULT NULL",
+            "geocode_tier": "varchar DEFAULT NULL",
+            "tiger_coverage_id": "integer DEFAULT NULL",
+        },
     )
+    record_current_tiger_coverage(engine=engine, schema_name=schema_name)
 
 
 def setup_address_table_for_address_normalization(
@@ -82,14 +202,14 @@ def setup_address_table_for_address_normalization(
     )
 
 
-def batch_normalize_address_table(
-    engine: Engine,
+def get_batch_normalize_query(
     schema_name: str = "user_data",
     table_name: str = "address_table",
     batch_size: int = 100,
-) -> None:
+    row_filter: str = "streetname IS NULL",
+) -> str:
     full_table_name = f"{schema_name}.{table_name}"
-    query = f"""
+    return f"""
         UPDATE {full_table_name}
         SET
             (
@@ -102,15 +222,26 @@ def batch_normalize_address_table(
             )
         FROM
             (
-                SELECT full_address, streetname
+                SELECT address_id, full_address, streetname
                 FROM {full_table_name}
-                WHERE streetname IS NULL LIMIT {batch_size}
+                WHERE {row_filter} LIMIT {batch_size}
             ) AS a
             LEFT JOIN LATERAL
             normalize_address(a.full_address) AS na
             ON true
-        WHERE a.full_address = {full_table_name}.full_address;
+        WHERE a.address_id = {full_table_name}.address_id;
     """
+
+
+def batch_normalize_address_table(
+    engine: Engine,
+    schema_name: str = "user_data",
+    table_name: str = "address_table",
+    batch_size: int = 100,
+) -> None:
+    query = get_batch_normalize_query(
+        schema_name=schema_name, table_name=table_name, batch_size=batch_size
+    )
     execute_structural_command(query=query, engine=engine)
 
 
@@ -131,6 +262,7 @@ def add_addresses_to_address_table(
             + "pandas DataFrame that has a column named 'full_address' that contains full addresses."
         )
         full_addresses = full_addresses["full_address"].copy()
+    full_addresses = full_addresses.drop_duplicates()
     full_addresses.to_sql(
         name=table_name,
         schema=schema_name,
@@ -141,44 +273,60 @@ def add_addresses_to_address_table(
     )
 
 
-def batch_geocode_address_table(
-    engine: Engine,
+def get_batch_geocode_query(
     schema_name: str = "user_data",
     table_name: str = "address_table",
     batch_size: int = 100,
     rating_threshold: int = 22,
-) -> None:
+    row_filter: str = "rating IS NULL",
+) -> str:
     full_table_name = f"{schema_name}.{table_name}"
-    query = f"""
+    return f"""
         UPDATE {full_table_name}
         SET 
-            (rating, norm_address, geomout) = 
-            (COALESCE((g).rating,-1 ), pprint_addy( (g).addy ), (g).geomout)
+            (rating, norm_address, geomout, geocode_tier, tiger_coverage_id) = 
+            (COALESCE((g).rating,-1 ), pprint_addy( (g).addy ), (g).geomout, 'normalized',
+             {_get_current_tiger_coverage_id_sql(schema_name=schema_name)})
         FROM (
-                SELECT full_address, (address, predirabbrev, streetname, streettypeabbrev, 
+                SELECT address_id, (address, predirabbrev, streetname, streettypeabbrev, 
                         postdirabbrev, internal, location, stateabbrev, zip, parsed, zip4,
                         address_alphanumeric)::norm_addy AS addy
                 FROM {full_table_name}
-                WHERE rating IS NULL LIMIT {batch_size}
+                WHERE {row_filter} LIMIT {batch_size}
             ) AS a
             LEFT JOIN LATERAL
             geocode(a.addy) AS g
             ON ((g).rating < {rating_threshold})
-        WHERE a.full_address = {full_table_name}.full_address;
+        WHERE a.address_id = {full_table_name}.address_id;
     """
-    execute_structural_command(query=query, engine=engine)
+
+
+def batch_geocode_address_table(
+    engine: Engine,
+    schema_name: str = "user_data",
+    table_name: str = "address_table",
+    batch_size: int = 100,
+    rating_threshold: int = 22,
+) -> int:
+    query = get_batch_geocode_query(
+        schema_name=schema_name,
+        table_name=table_name,
+        batch_size=batch_size,
+        rating_threshold=rating_threshold,
+    )
+    return execute_row_count_returning_command(query=query, engine=engine)
 
 
 def get_default_geocode_settings(engine: Engine) -> pd.DataFrame:
     """Returns default geocode_settings."""
     default_geocode_settings = execute_result_returning_query(
-        query="SELECT * FROM tiger.geocode_settings;", engine=engine
+        query="SELECT * FROM tiger.geocode_settings_default;", engine=engine
     )
     return default_geocode_settings
 
 
 def get_current_geocode_settings(engine: Engine) -> pd.DataFrame:
-    """Returns default geocode_settings."""
+    """Returns current geocode_settings."""
     geocode_settings = execute_result_returning_query(
         query="SELECT * FROM tiger.geocode_settings;", engine=engine
     )
@@ -207,6 +355,9 @@ def count_rows_w_null_values_in_a_column(
 def add_addr_standardization_columns_to_an_address_table(
     engine: Engine, schema_name: str = "user_data", table_name: str = "std_address_table"
 ) -> None:
+    add_surrogate_key_to_address_table(
+        engine=engine, schema_name=schema_name, table_name=table_name
+    )
     execute_structural_command(
         query=f"""
             ALTER TABLE {schema_name}.{table_name}
@@ -249,7 +400,7 @@ def batch_standardize_address_table(
             (sa).country, (sa).postcode, (sa).box, (sa).unit
         )
         FROM (
-            SELECT full_address, name
+            SELECT address_id, full_address, name
             FROM {full_table_name}
             WHERE name IS NULL LIMIT {batch_size}
             ) AS a
@@ -258,7 +409,7 @@ def batch_standardize_address_table(
                 'tiger.pagc_lex', 'tiger.pagc_gaz', 'tiger.pagc_rules', a.full_address
             ) AS sa
         ON true
-        WHERE a.full_address = {full_table_name}.full_address;
+        WHERE a.address_id = {full_table_name}.address_id;
     """
     execute_structural_command(query=query, engine=engine)
 
@@ -271,6 +422,8 @@ def _apply_function_to_all_address_table_rows(
     schema_name: str = "user_data",
     batch_size: int = 100,
 ) -> None:
+    from tqdm import tqdm
+
     rows_left = count_rows_w_null_values_in_a_column(
         engine=engine, null_check_col=null_check_col, schema_name=schema_name, table_name=table_name
     )
@@ -281,6 +434,16 @@ def _apply_function_to_all_address_table_rows(
         )
 
 
+def _run_batches_until_exhausted(batch_func: Callable, progress_bar: "tqdm", **kwargs) -> int:
+    total_rows_updated = 0
+    rows_updated = batch_func(**kwargs)
+    while rows_updated > 0:
+        total_rows_updated = total_rows_updated + rows_updated
+        progress_bar.update(rows_updated)
+        rows_updated = batch_func(**kwargs)
+    return total_rows_updated
+
+
 def normalize_all_addresses_in_address_table(
     engine: Engine,
     schema_name: str = "user_data",
@@ -303,6 +466,9 @@ def standardize_all_addresses_in_address_table(
     table_name: str = "std_address_table",
     batch_size: int = 100,
 ) -> None:
+    add_surrogate_key_to_address_table(
+        engine=engine, schema_name=schema_name, table_name=table_name
+    )
     _apply_function_to_all_address_table_rows(
         engine=engine,
         schema_name=schema_name,
@@ -327,7 +493,7 @@ def batch_geocode_standardized_address_table(
             (rating, norm_address, geomout) =
             (COALESCE((g).rating,-1 ), pprint_addy( (g).addy ), (g).geomout)
         FROM (
-                SELECT full_address, (house_num, predir, name, suftype, sufdir, unit,
+                SELECT address_id, (house_num, predir, name, suftype, sufdir, unit,
                        city, state, postcode, true, NULL, NULL)::norm_addy AS addy
                 FROM {full_table_name}
                 WHERE rating IS NULL LIMIT {batch_size}
@@ -335,7 +501,7 @@ def batch_geocode_standardized_address_table(
             LEFT JOIN LATERAL
             geocode(a.addy) AS g
             ON ((g).rating < {rating_threshold})
-        WHERE a.full_address = {full_table_name}.full_address;
+        WHERE a.address_id = {full_table_name}.address_id;
     """
     execute_structural_command(query=query, engine=engine)
 
@@ -346,6 +512,9 @@ def geocode_all_addresses_in_standardized_address_table(
     table_name: str = "std_address_table",
     batch_size: int = 100,
 ) -> None:
+    add_surrogate_key_to_address_table(
+        engine=engine, schema_name=schema_name, table_name=table_name
+    )
     _apply_function_to_all_address_table_rows(
         engine=engine,
         schema_name=schema_name,
@@ -362,6 +531,9 @@ def geocode_all_addresses_in_normalized_address_table(
     table_name: str = "address_table",
     batch_size: int = 100,
 ) -> None:
+    add_geocode_output_columns_to_address_table(
+        engine=engine, schema_name=schema_name, table_name=table_name
+    )
     _apply_function_to_all_address_table_rows(
         engine=engine,
         schema_name=schema_name,
@@ -372,18 +544,845 @@ def geocode_all_addresses_in_normalized_address_table(
     )
 
 
-def read_geocoded_address_table_w_lat_longs(
+CENTROID_FALLBACK_RATING = 100
+
+_CASCADE_TIER_FILTERS = {
+    "cache": "rating IS NULL AND streetname IS NOT NULL",
+    "normalized": "rating IS NULL",
+    "standardized": "rating = -1 AND (geocode_tier = 'normalized' OR geocode_tier IS NULL)",
+    "centroid": (
+        "rating = -1 AND COALESCE(geocode_tier, '') NOT IN "
+        + "('centroid', 'zip_centroid', 'place_centroid', 'quarantined')"
+    ),
+}
+_NORMALIZED_ADDRESS_KEY = """format(
+    '%s|%s|%s|%s|%s|%s|%s|%s|%s', address, predirabbrev, streetname, streettypeabbrev,
+    postdirabbrev, internal, location, stateabbrev, zip
+)"""
+
+
+def geocode_address_table_from_matched_normalized_addresses(
+    engine: Engine,
+    schema_name: str = "user_data",
+    table_name: str = "address_table",
+) -> int:
+    """Copies geocoding results onto ungeocoded rows from already-geocoded rows with the same
+    normalized address (eg "123 N Main St" and "123 North Main Street"), so geocode() is never
+    called for them. Centroid fallbacks aren't reused. Returns the number of rows matched."""
+    full_table_name = f"{schema_name}.{table_name}"
+    query = f"""
+        WITH matched AS (
+            SELECT DISTINCT ON (norm_key)
+                norm_key, rating AS m_rating, norm_address AS m_norm_address, geomout AS m_geomout,
+                tiger_coverage_id AS m_tiger_coverage_id
+            FROM (
+                SELECT {_NORMALIZED_ADDRESS_KEY} AS norm_key, rating, norm_address, geomout,
+                    tiger_coverage_id
+                FROM {full_table_name}
+                WHERE rating >= 0
+                AND (geocode_tier IS NULL OR geocode_tier NOT IN ('zip_centroid', 'place_centroid'))
+            ) AS m
+            ORDER BY norm_key, rating
+        )
+        UPDATE {full_table_name}
+        SET
+            (rating, norm_address, geomout, geocode_tier, tiger_coverage_id) =
+            (m_rating, m_norm_address, m_geomout, 'cache', m_tiger_coverage_id)
+        FROM matched
+        WHERE {_CASCADE_TIER_FILTERS["cache"]}
+        AND {_NORMALIZED_ADDRESS_KEY} = matched.norm_key;
+    """
+    return execute_row_count_returning_command(query=query, engine=engine)
+
+
+def batch_geocode_address_table_w_standardized_fallback(
+    engine: Engine,
+    schema_name: str = "user_data",
+    table_name: str = "address_table",
+    batch_size: int = 100,
+    rating_threshold: int = 22,
+) -> int:
+    """Retries rows that the normalized geocode() missed, this time geocoding the PAGC
+    standardizer's parse of the full address (via tiger's pagc_normalize_address, which maps
+    PAGC's output onto the abbreviations geocode() expects and keeps non-numeric house numbers
+    like "123A" from failing the batch). Returns the number of rows attempted."""
+    full_table_name = f"{schema_name}.{table_name}"
+    query = f"""
+        UPDATE {full_table_name}
+        SET
+            (rating, norm_address, geomout, geocode_tier, tiger_coverage_id) =
+            (COALESCE((g).rating,-1 ), pprint_addy( (g).addy ), (g).geomout, 'standardized',
+             {_get_current_tiger_coverage_id_sql(schema_name=schema_name)})
+        FROM (
+                SELECT address_id, pagc_normalize_address(full_address) AS addy
+                FROM {full_table_name}
+                WHERE {_CASCADE_TIER_FILTERS["standardized"]} LIMIT {batch_size}
+            ) AS a
+            LEFT JOIN LATERAL
+            geocode(a.addy) AS g
+            ON ((g).rating < {rating_threshold})
+        WHERE a.address_id = {full_table_name}.address_id;
+    """
+    return execute_row_count_returning_command(query=query, engine=engine)
+
+
+def batch_geocode_address_table_w_centroid_fallback(
+    engine: Engine,
+    schema_name: str = "user_data",
+    table_name: str = "address_table",
+    batch_size: int = 100,
+) -> int:
+    """Places rows that no geocode() path matched at the internal point of their ZIP code
+    (ZCTA) or, failing that, of their city/place. These rows get a rating of
+    CENTROID_FALLBACK_RATING and a geocode_tier of 'zip_centroid' or 'place_centroid'; rows
+    with neither keep a rating of -1. ZIP centroids need the tiger.zcta5 tables to be loaded.
+    Returns the number of rows attempted."""
+    full_table_name = f"{schema_name}.{table_name}"
+    query = f"""
+        UPDATE {full_table_name}
+        SET
+            (rating, geomout, geocode_tier, tiger_coverage_id) = (
+                CASE WHEN COALESCE(z.pt, p.pt) IS NULL THEN -1
+                     ELSE {CENTROID_FALLBACK_RATING} END,
+                COALESCE(z.pt, p.pt),
+                CASE WHEN z.pt IS NOT NULL THEN 'zip_centroid'
+                     WHEN p.pt IS NOT NULL THEN 'place_centroid'
+                     ELSE 'centroid' END,
+                {_get_current_tiger_coverage_id_sql(schema_name=schema_name)}
+            )
+        FROM (
+                SELECT address_id, zip, location, stateabbrev
+                FROM {full_table_name}
+                WHERE {_CASCADE_TIER_FILTERS["centroid"]} LIMIT {batch_size}
+            ) AS a
+            LEFT JOIN LATERAL (
+                SELECT ST_SetSRID(ST_Point(intptlon::float, intptlat::float), 4269) AS pt
+                FROM tiger.zcta5
+                WHERE zcta5ce = a.zip LIMIT 1
+            ) AS z ON true
+            LEFT JOIN LATERAL (
+                SELECT ST_SetSRID(ST_Point(pl.intptlon::float, pl.intptlat::float), 4269) AS pt
+                FROM tiger.place AS pl
+                    INNER JOIN tiger.state_lookup AS sl ON sl.statefp = pl.statefp
+                WHERE soundex(pl.name) = soundex(a.location)
+                AND upper(pl.name) = upper(a.location)
+                AND sl.abbrev = a.stateabbrev
+                LIMIT 1
+            ) AS p ON true
+        WHERE a.address_id = {full_table_name}.address_id;
+    """
+    return execute_row_count_returning_command(query=query, engine=engine)
+
+
+def _count_rows_matching_filter(
+    engine: Engine, schema_name: str, table_name: str, row_filter: str
+) -> int:
+    count_df = execute_result_returning_query(
+        query=f"""
+            SELECT COUNT(*)
+            FROM {schema_name}.{table_name}
+            WHERE {row_filter};
+        """,
+        engine=engine,
+    )
+    return count_df["count"].values[0]
+
+
+def geocode_address_table_w_fallback_cascade(
+    engine: Engine,
+    schema_name: str = "user_data",
+    table_name: str = "address_table",
+    batch_size: int = 100,
+    rating_threshold: int = 22,
+    tiers: Tuple[str, ...] = ("cache", "normalized", "standardized"),
+    time_budget_ms: Optional[int] = None,
+    tuning_profile: Optional[str] = None,
+    verbose: bool = True,
+) -> pd.DataFrame:
+    """Geocodes a normalized address table by running progressively more expensive tiers, each
+    only over the rows the previous tiers missed:
+        "cache":        reuse results from already-geocoded rows with the same normalized address
+        "normalized":   geocode() the normalize_address() parse (ie batch_geocode_address_table)
+        "standardized": geocode() the PAGC (pagc_normalize_address()) parse of normalized misses
+        "centroid":     place remaining misses at their ZIP or place centroid (off by default)
+
+    If time_budget_ms is given, the "normalized" tier geocodes each address under that budget
+    and quarantines the ones that exceed it (see batch_geocode_address_table_w_time_budget).
+    If tuning_profile is given, every connection runs with that profile's settings (see
+    postgisgeocoder.tuning).
+
+    Returns a DataFrame with the rows attempted, rows matched, and run time of each tier."""
+    from tqdm import tqdm
+
+    unknown_tiers = [tier for tier in tiers if tier not in _CASCADE_TIER_FILTERS]
+    if len(unknown_tiers) > 0:
+        raise ValueError(
+            f"Unknown cascade tier(s): {unknown_tiers}. "
+            + f"Valid tiers: {list(_CASCADE_TIER_FILTERS.keys())}"
+        )
+    if tuning_profile is not None:
+        engine = get_tuned_engine(engine=engine, profile_name=tuning_profile)
+    add_geocode_output_columns_to_address_table(
+        engine=engine, schema_name=schema_name, table_name=table_name
+    )
+    table_kwargs = {"engine": engine, "schema_name": schema_name, "table_name": table_name}
+    tier_batch_funcs = {
+        "normalized": partial(batch_geocode_address_table, rating_threshold=rating_threshold),
+        "standardized": partial(
+            batch_geocode_address_table_w_standardized_fallback, rating_threshold=rating_threshold
+        ),
+        "centroid": batch_geocode_address_table_w_centroid_fallback,
+    }
+    if time_budget_ms is not None:
+        create_address_quarantine_table(**table_kwargs)
+        tier_batch_funcs["normalized"] = partial(
+            batch_geocode_address_table_w_time_budget,
+            rating_threshold=rating_threshold,
+            time_budget_ms=time_budget_ms,
+        )
+    tier_stats = []
+    matched_rows = _count_rows_matching_filter(row_filter="rating >= 0", **table_kwargs)
+    for tier in tiers:
+        rows_attempted = _count_rows_matching_filter(
+            row_filter=_CASCADE_TIER_FILTERS[tier], **table_kwargs
+        )
+        start_time = time.perf_counter()
+        if tier == "cache":
+            geocode_address_table_from_matched_normalized_addresses(**table_kwargs)
+        else:
+            with tqdm(total=rows_attempted, desc=tier, disable=not verbose) as progress_bar:
+                _run_batches_until_exhausted(
+                    batch_func=tier_batch_funcs[tier],
+                    progress_bar=progress_bar,
+                    batch_size=batch_size,
+                    **table_kwargs,
+                )
+        run_time = time.perf_counter() - start_time
+        prior_matched_rows = matched_rows
+        matched_rows = _count_rows_matching_filter(row_filter="rating >= 0", **table_kwargs)
+        tier_stats.append(
+            {
+                "tier": tier,
+                "rows_attempted": rows_attempted,
+                "rows_matched": matched_rows - prior_matched_rows,
+                "run_time_seconds": round(run_time, 4),
+            }
+        )
+    tier_stats_df = pd.DataFrame(tier_stats)
+    if verbose:
+        print(tier_stats_df.to_string(index=False))
+    return tier_stats_df
+
+
+QUERY_CANCELED_SQLSTATE = "57014"
+
+
+def _get_quarantine_table_name(table_name: str, quarantine_table_name: Optional[str]) -> str:
+    if quarantine_table_name is None:
+        return f"{table_name}_quarantine"
+    return quarantine_table_name
+
+
+def create_address_quarantine_table(
+    engine: Engine,
+    schema_name: str = "user_data",
+    table_name: str = "address_table",
+    quarantine_table_name: Optional[str] = None,
+) -> None:
+    quarantine_table_name = _get_quarantine_table_name(table_name, quarantine_table_name)
+    execute_structural_command(
+        query=f"""
+            CREATE TABLE IF NOT EXISTS {schema_name}.{quarantine_table_name} (
+                address_id bigint PRIMARY KEY,
+                full_address text,
+                time_budget_ms integer,
+                elapsed_ms numeric(12,3),
+                attempts integer DEFAULT 1,
+                quarantined_at timestamptz DEFAULT now()
+            );
+        """,
+        engine=engine,
+    )
+
+
+def _geocode_address_w_time_budget(
+    conn: Connection,
+    address_id: int,
+    schema_name: str,
+    table_name: str,
+    quarantine_table_name: str,
+    time_budget_ms: int,
+    rating_threshold: int,
+    tiger_coverage_id: Optional[int],
+) -> bool:
+    """Geocodes one address inside a savepoint of conn's open transaction (which must have
+    statement_timeout set to time_budget_ms) and stamps it with tiger_coverage_id. If geocode()
+    is cancelled by the timeout, only the savepoint is rolled back; the address is recorded in
+    the quarantine table and marked with a rating of -1 and a geocode_tier of 'quarantined'.
+    Returns False if the address was quarantined."""
+    full_table_name = f"{schema_name}.{table_name}"
+    start_time = time.perf_counter()
+    try:
+        with conn.begin_nested():
+            conn.execute(
+                text(
+                    f"""
+                    UPDATE {full_table_name}
+                    SET
+                        (rating, norm_address, geomout, geocode_tier, tiger_coverage_id) =
+                        (COALESCE((g).rating,-1 ), pprint_addy( (g).addy ), (g).geomout,
+                         'normalized', :tiger_coverage_id)
+                    FROM (
+                            SELECT address_id, (address, predirabbrev, streetname,
+                                    streettypeabbrev, postdirabbrev, internal, location,
+                                    stateabbrev, zip, parsed, zip4,
+                                    address_alphanumeric)::norm_addy AS addy
+                            FROM {full_table_name}
+                            WHERE address_id = :address_id
+                        ) AS a
+                        LEFT JOIN LATERAL
+                        geocode(a.addy) AS g
+                        ON ((g).rating < {rating_threshold})
+                    WHERE a.address_id = {full_table_name}.address_id;
+                """
+                ),
+                {"address_id": address_id, "tiger_coverage_id": tiger_coverage_id},
+            )
+        return True
+    except DBAPIError as err:
+        if getattr(err.orig, "pgcode", None) != QUERY_CANCELED_SQLSTATE:
+            raise
+    elapsed_ms = 1000 * (time.perf_counter() - start_time)
+    conn.execute(
+        text(
+            f"""
+            INSERT INTO {schema_name}.{quarantine_table_name} AS q
+                (address_id, full_address, time_budget_ms, elapsed_ms)
+            SELECT address_id, full_address, {time_budget_ms}, {elapsed_ms:.3f}
+            FROM {full_table_name}
+            WHERE address_id = :address_id
+            ON CONFLICT (address_id) DO UPDATE
+            SET (time_budget_ms, elapsed_ms, attempts, quarantined_at) =
+                (EXCLUDED.time_budget_ms, EXCLUDED.elapsed_ms, q.attempts + 1, now());
+        """
+        ),
+        {"address_id": address_id},
+    )
+    conn.execute(
+        text(
+            f"""
+            UPDATE {full_table_name}
+            SET (rating, geocode_tier) = (-1, 'quarantined')
+            WHERE address_id = :address_id;
+        """
+        ),
+        {"address_id": address_id},
+    )
+    return False
+
+
+def batch_geocode_address_table_w_time_budget(
+    engine: Engine,
+    schema_name: str = "user_data",
+    table_name: str = "address_table",
+    batch_size: int = 100,
+    rating_threshold: int = 22,
+    time_budget_ms: int = 2000,
+    quarantine_table_name: Optional[str] = None,
+) -> int:
+    """Like batch_geocode_address_table, but each address is geocoded by its own statement under
+    a statement_timeout of time_budget_ms, so a pathological address is quarantined instead of
+    stalling (or rolling back) the rest of the batch. Returns the number of rows attempted."""
+    quarantine_table_name = _get_quarantine_table_name(table_name, quarantine_table_name)
+    with engine.connect() as conn:
+        with conn.begin():
+            conn.execute(text(f"SET LOCAL statement_timeout = {int(time_budget_ms)};"))
+            tiger_coverage_id = _get_current_tiger_coverage_id(conn=conn, schema_name=schema_name)
+            address_ids = conn.execute(
+                text(
+                    f"""
+                    SELECT address_id
+                    FROM {schema_name}.{table_name}
+                    WHERE rating IS NULL LIMIT {batch_size}
+                    FOR UPDATE SKIP LOCKED;
+                """
+                )
+            ).scalars().all()
+            for address_id in address_ids:
+                _geocode_address_w_time_budget(
+                    conn=conn,
+                    address_id=address_id,
+                    schema_name=schema_name,
+                    table_name=table_name,
+                    quarantine_table_name=quarantine_table_name,
+                    time_budget_ms=time_budget_ms,
+                    rating_threshold=rating_threshold,
+                    tiger_coverage_id=tiger_coverage_id,
+                )
+    return len(address_ids)
+
+
+def geocode_all_addresses_in_normalized_address_table_w_time_budget(
+    engine: Engine,
+    schema_name: str = "user_data",
+    table_name: str = "address_table",
+    batch_size: int = 100,
+    rating_threshold: int = 22,
+    time_budget_ms: int = 2000,
+    quarantine_table_name: Optional[str] = None,
+    tuning_profile: Optional[str] = None,
+) -> int:
+    """Geocodes every ungeocoded row with a per-address time budget. Returns the number of
+    addresses quarantined by this run."""
+    from tqdm import tqdm
+
+    if tuning_profile is not None:
+        engine = get_tuned_engine(engine=engine, profile_name=tuning_profile)
+    quarantine_table_name = _get_quarantine_table_name(table_name, quarantine_table_name)
+    add_geocode_output_columns_to_address_table(
+        engine=engine, schema_name=schema_name, table_name=table_name
+    )
+    create_address_quarantine_table(
+        engine=engine,
+        schema_name=schema_name,
+        table_name=table_name,
+        quarantine_table_name=quarantine_table_name,
+    )
+    quarantine_filter = "geocode_tier = 'quarantined'"
+    quarantined_before = _count_rows_matching_filter(
+        engine=engine, schema_name=schema_name, table_name=table_name, row_filter=quarantine_filter
+    )
+    rows_left = count_rows_w_null_values_in_a_column(
+        engine=engine, null_check_col="rating", schema_name=schema_name, table_name=table_name
+    )
+    with tqdm(total=rows_left) as progress_bar:
+        _run_batches_until_exhausted(
+            batch_func=batch_geocode_address_table_w_time_budget,
+            progress_bar=progress_bar,
+            engine=engine,
+            schema_name=schema_name,
+            table_name=table_name,
+            batch_size=batch_size,
+            rating_threshold=rating_threshold,
+            time_budget_ms=time_budget_ms,
+            quarantine_table_name=quarantine_table_name,
+        )
+    quarantined_after = _count_rows_matching_filter(
+        engine=engine, schema_name=schema_name, table_name=table_name, row_filter=quarantine_filter
+    )
+    return quarantined_after - quarantined_before
+
+
+def retry_quarantined_addresses(
+    engine: Engine,
+    schema_name: str = "user_data",
+    table_name: str = "address_table",
+    rating_threshold: int = 22,
+    time_budget_ms: int = 30000,
+    max_attempts: int = 3,
+    quarantine_table_name: Optional[str] = None,
+) -> pd.DataFrame:
+    """Retries quarantined addresses (that have been attempted fewer than max_attempts times)
+    with a larger time budget. Addresses that finish are removed from the quarantine table; the
+    rest stay there with an incremented attempt count. Returns the remaining quarantine table."""
+    from tqdm import tqdm
+
+    quarantine_table_name = _get_quarantine_table_name(table_name, quarantine_table_name)
+    full_quarantine_table_name = f"{schema_name}.{quarantine_table_name}"
+    quarantined_df = execute_result_returning_query(
+        query=f"""
+            SELECT address_id
+            FROM {full_quarantine_table_name}
+            WHERE attempts < {max_attempts};
+        """,
+        engine=engine,
+    )
+    for address_id in tqdm(quarantined_df["address_id"]):
+        with engine.connect() as conn:
+            with conn.begin():
+                conn.execute(text(f"SET LOCAL statement_timeout = {int(time_budget_ms)};"))
+                tiger_coverage_id = _get_current_tiger_coverage_id(
+                    conn=conn, schema_name=schema_name
+                )
+                finished = _geocode_address_w_time_budget(
+                    conn=conn,
+                    address_id=int(address_id),
+                    schema_name=schema_name,
+                    table_name=table_name,
+                    quarantine_table_name=quarantine_table_name,
+                    time_budget_ms=time_budget_ms,
+                    rating_threshold=rating_threshold,
+                    tiger_coverage_id=tiger_coverage_id,
+                )
+                if finished:
+                    conn.execute(
+                        text(
+                            f"""
+                            DELETE FROM {full_quarantine_table_name}
+                            WHERE address_id = :address_id;
+                        """
+                        ),
+                        {"address_id": int(address_id)},
+                    )
+    return execute_result_returning_query(
+        query=f"SELECT * FROM {full_quarantine_table_name};", engine=engine
+    )
+
+
+CENSUS_GEOGRAPHY_COLUMNS = ["county_geoid", "tract_geoid", "block_group_geoid", "place_geoid"]
+
+
+def add_census_geography_columns_to_address_table(
     engine: Engine, schema_name: str = "user_data", table_name: str = "address_table"
-) -> gpd.GeoDataFrame:
+) -> None:
+    _add_missing_columns_to_table(
+        engine=engine,
+        schema_name=schema_name,
+        table_name=table_name,
+        column_definitions={
+            "county_geoid": "varchar(5) DEFAULT NULL",
+            "tract_geoid": "varchar(11) DEFAULT NULL",
+            "block_group_geoid": "varchar(12) DEFAULT NULL",
+            "place_geoid": "varchar(7) DEFAULT NULL",
+        },
+    )
+
+
+def batch_enrich_address_table_with_census_geographies(
+    engine: Engine,
+    schema_name: str = "user_data",
+    table_name: str = "address_table",
+    batch_size: int = 1000,
+) -> int:
+    """Point-in-polygon joins a batch of geocoded (geomout) points against the block group and
+    place geometries loaded into the tiger schema and writes back the GEOIDs. GEOIDs are
+    hierarchical, so the tract and county GEOIDs are prefixes of the block group's (which keeps
+    all three consistent for points on shared boundaries); tiger.county is only probed for
+    points where no block group data is loaded.
+
+    Each lookup is a LATERAL probe of a GiST-indexed TIGER table, so cost scales with the batch,
+    not with the size of the TIGER tables. Points that don't fall in any loaded county get a
+    county_geoid of '-1' (mirroring the rating of -1 for failed geocodes) so they aren't
+    reselected. Rows are claimed with SKIP LOCKED, so several batches can run concurrently.
+    Returns the number of rows updated."""
+    full_table_name = f"{schema_name}.{table_name}"
+    query = f"""
+        UPDATE {full_table_name}
+        SET
+            (county_geoid, tract_geoid, block_group_geoid, place_geoid) =
+            (
+                COALESCE(left(bg.bg_id, 5), c.cntyidfp, '-1'),
+                left(bg.bg_id, 11),
+                bg.bg_id,
+                p.plcidfp
+            )
+        FROM (
+                SELECT address_id, geomout
+                FROM {full_table_name}
+                WHERE geomout IS NOT NULL AND county_geoid IS NULL
+                LIMIT {batch_size}
+                FOR UPDATE SKIP LOCKED
+            ) AS a
+            LEFT JOIN LATERAL (
+                SELECT bg_id FROM tiger.bg
+                WHERE ST_Intersects(the_geom, a.geomout) LIMIT 1
+            ) AS bg ON true
+            LEFT JOIN LATERAL (
+                SELECT cntyidfp FROM tiger.county
+                WHERE bg.bg_id IS NULL AND ST_Intersects(the_geom, a.geomout) LIMIT 1
+            ) AS c ON true
+            LEFT JOIN LATERAL (
+                SELECT plcidfp FROM tiger.place
+                WHERE ST_Intersects(the_geom, a.geomout) LIMIT 1
+            ) AS p ON true
+        WHERE a.address_id = {full_table_name}.address_id;
+    """
+    return execute_row_count_returning_command(query=query, engine=engine)
+
+
+def enrich_with_census_geographies(
+    engine: Engine,
+    schema_name: str = "user_data",
+    table_name: str = "address_table",
+    batch_size: int = 1000,
+    n_workers: int = 4,
+    tuning_profile: Optional[str] = None,
+) -> int:
+    """Adds county, tract, block group, and place GEOIDs to every geocoded address in the
+    indicated table that doesn't have them yet, running batches on n_workers connections
+    in parallel. Returns the number of rows enriched.
+
+    Census blocks aren't included as load_tiger_data.sh doesn't load the tabblock tables."""
+    from tqdm import tqdm
+
+    if tuning_profile is not None:
+        engine = get_tuned_engine(engine=engine, profile_name=tuning_profile)
+    add_census_geography_columns_to_address_table(
+        engine=engine, schema_name=schema_name, table_name=table_name
+    )
+    full_table_name = f"{schema_name}.{table_name}"
+    rows_left_df = execute_result_returning_query(
+        query=f"""
+            SELECT COUNT(*)
+            FROM {full_table_name}
+            WHERE geomout IS NOT NULL AND county_geoid IS NULL;
+        """,
+        engine=engine,
+    )
+    rows_left = rows_left_df["count"].values[0]
+    with tqdm(total=rows_left) as progress_bar:
+        with ThreadPoolExecutor(max_workers=n_workers) as executor:
+            futures = [
+                executor.submit(
+                    _run_batches_until_exhausted,
+                    batch_func=batch_enrich_address_table_with_census_geographies,
+                    progress_bar=progress_bar,
+                    engine=engine,
+                    schema_name=schema_name,
+                    table_name=table_name,
+                    batch_size=batch_size,
+                )
+                for _ in range(n_workers)
+            ]
+            total_rows_enriched = sum(future.result() for future in futures)
+    return total_rows_enriched
+
+
+def get_tiger_vintage(engine: Engine) -> str:
+    """Returns the year of the TIGER data loaded into the database (as recorded by
+    load_tiger_data.sh in tiger.loader_variables)."""
+    vintage_df = execute_result_returning_query(
+        query="SELECT tiger_year FROM tiger.loader_variables LIMIT 1;", engine=engine
+    )
+    return vintage_df["tiger_year"].values[0]
+
+
+_LOADED_TIGER_STATES_QUERY = """
+    SELECT upper(left(tablename, 2))::varchar AS stusps
+    FROM pg_tables
+    WHERE schemaname = 'tiger_data'
+    AND tablename ~ '^[a-z]{2}_addr$'
+"""
+
+
+def get_loaded_tiger_states(engine: Engine) -> List[str]:
+    """Returns the abbreviations of states with address data loaded in the tiger_data schema."""
+    loaded_states_df = execute_result_returning_query(
+        query=f"{_LOADED_TIGER_STATES_QUERY} ORDER BY stusps;", engine=engine
+    )
+    return loaded_states_df["stusps"].to_list()
+
+
+def _format_as_sql_array(values: List[str]) -> str:
+    formatted_values = ", ".join([f"'{value}'" for value in values])
+    return f"ARRAY[{formatted_values}]::varchar[]"
+
+
+def record_current_tiger_coverage(engine: Engine, schema_name: str = "user_data") -> int:
+    """Records the currently loaded TIGER vintage and set of states in the tiger_coverage table
+    (if that combination isn't already recorded) and returns its coverage_id."""
+    execute_structural_command(
+        query=f"""
+            CREATE TABLE IF NOT EXISTS {schema_name}.tiger_coverage (
+                coverage_id serial PRIMARY KEY,
+                tiger_vintage varchar(4),
+                loaded_states varchar[],
+                recorded_at timestamptz DEFAULT now(),
+                UNIQUE (tiger_vintage, loaded_states)
+            );
+        """,
+        engine=engine,
+    )
+    tiger_vintage = get_tiger_vintage(engine=engine)
+    loaded_states = _format_as_sql_array(get_loaded_tiger_states(engine=engine))
+    execute_structural_command(
+        query=f"""
+            INSERT INTO {schema_name}.tiger_coverage (tiger_vintage, loaded_states)
+            VALUES ('{tiger_vintage}', {loaded_states})
+            ON CONFLICT (tiger_vintage, loaded_states) DO NOTHING;
+        """,
+        engine=engine,
+    )
+    coverage_df = execute_result_returning_query(
+        query=f"""
+            SELECT coverage_id
+            FROM {schema_name}.tiger_coverage
+            WHERE tiger_vintage = '{tiger_vintage}' AND loaded_states = {loaded_states};
+        """,
+        engine=engine,
+    )
+    return coverage_df["coverage_id"].values[0]
+
+
+def _get_current_tiger_coverage_id_sql(schema_name: str = "user_data") -> str:
+    """Returns a scalar subquery for the coverage_id of the currently loaded TIGER vintage and
+    states (NULL if record_current_tiger_coverage hasn't recorded that combination). It's
+    uncorrelated, so PostgreSQL evaluates it once per statement rather than once per row."""
+    return f"""(
+        SELECT coverage_id
+        FROM {schema_name}.tiger_coverage
+        WHERE tiger_vintage = (SELECT tiger_year FROM tiger.loader_variables LIMIT 1)
+        AND loaded_states = (
+            SELECT COALESCE(array_agg(stusps ORDER BY stusps), ARRAY[]::varchar[])
+            FROM ({_LOADED_TIGER_STATES_QUERY}) AS s
+        )
+    )"""
+
+
+def _get_current_tiger_coverage_id(conn: Connection, schema_name: str) -> Optional[int]:
+    return conn.execute(
+        text(f"SELECT {_get_current_tiger_coverage_id_sql(schema_name=schema_name)};")
+    ).scalar()
+
+
+def reset_address_table_rows_for_regeocoding(
+    engine: Engine,
+    schema_name: str = "user_data",
+    table_name: str = "address_table",
+    states: Optional[List[str]] = None,
+    zips: Optional[List[str]] = None,
+    include_newly_loaded_states: bool = True,
+    include_unmatched: bool = True,
+    include_stale_vintage: bool = False,
+    renormalize: bool = True,
+) -> int:
+    """Clears the geocoding results (and census geographies, if present) of rows affected by a
+    TIGER data update so the next geocoding run redoes only those rows. A row is affected if any
+    enabled condition holds:
+        states / zips:               its state or ZIP is in the given list
+        include_newly_loaded_states: its state is loaded now but wasn't when it was geocoded
+        include_unmatched:           it was never matched (rating -1; quarantined rows excluded)
+        include_stale_vintage:       it was geocoded against a different TIGER vintage
+    Rows without a recorded coverage (eg geocoded before coverage was tracked) have unknown
+    provenance, so both the newly-loaded-states and stale-vintage conditions treat them as
+    affected. Returns the number of rows reset."""
+    full_table_name = f"{schema_name}.{table_name}"
+    current_coverage_id = record_current_tiger_coverage(engine=engine, schema_name=schema_name)
+    affected_row_conditions = []
+    if states:
+        affected_row_conditions.append(f"at.stateabbrev = ANY({_format_as_sql_array(states)})")
+    if zips:
+        affected_row_conditions.append(f"at.zip = ANY({_format_as_sql_array(zips)})")
+    if include_newly_loaded_states:
+        affected_row_conditions.append(
+            "(at.stateabbrev = ANY(cur.loaded_states) "
+            + "AND (tc.coverage_id IS NULL OR NOT at.stateabbrev = ANY(tc.loaded_states)))"
+        )
+    if include_unmatched:
+        affected_row_conditions.append(
+            "(at.rating = -1 AND at.geocode_tier IS DISTINCT FROM 'quarantined')"
+        )
+    if include_stale_vintage:
+        affected_row_conditions.append(
+            "(tc.coverage_id IS NULL OR tc.tiger_vintage <> cur.tiger_vintage)"
+        )
+    if len(affected_row_conditions) == 0:
+        raise ValueError("At least one condition for selecting rows to re-geocode is required.")
+
+    table_cols = get_table_column_details(
+        engine=engine, schema_name=schema_name, table_name=table_name
+    )["column_name"].to_list()
+    reset_cols = ["rating", "norm_address", "geomout", "geocode_tier", "tiger_coverage_id"]
+    reset_cols = reset_cols + [col for col in CENSUS_GEOGRAPHY_COLUMNS if col in table_cols]
+    if renormalize:
+        reset_cols = reset_cols + ["streetname"]
+    reset_cols_str = ", ".join(reset_cols)
+    null_values_str = ", ".join(["NULL" for _ in reset_cols])
+    return execute_row_count_returning_command(
+        query=f"""
+            UPDATE {full_table_name}
+            SET ({reset_cols_str}) = ({null_values_str})
+            FROM (
+                SELECT at.address_id
+                FROM {full_table_name} AS at
+                    LEFT JOIN {schema_name}.tiger_coverage AS tc
+                    ON at.tiger_coverage_id = tc.coverage_id
+                    CROSS JOIN (
+                        SELECT tiger_vintage, loaded_states
+                        FROM {schema_name}.tiger_coverage
+                        WHERE coverage_id = {current_coverage_id}
+                    ) AS cur
+                WHERE at.rating IS NOT NULL
+                AND ({" OR ".join(affected_row_conditions)})
+            ) AS a
+            WHERE a.address_id = {full_table_name}.address_id;
+        """,
+        engine=engine,
+    )
+
+
+def regeocode_address_table_incrementally(
+    engine: Engine,
+    schema_name: str = "user_data",
+    table_name: str = "address_table",
+    batch_size: int = 100,
+    states: Optional[List[str]] = None,
+    zips: Optional[List[str]] = None,
+    include_newly_loaded_states: bool = True,
+    include_unmatched: bool = True,
+    include_stale_vintage: bool = False,
+    renormalize: bool = True,
+    tuning_profile: Optional[str] = None,
+) -> int:
+    """Re-geocodes only the rows affected by a TIGER data update (see
+    reset_address_table_rows_for_regeocoding); the geocoding UPDATEs stamp each re-geocoded row
+    with the current TIGER coverage. Returns the number of rows re-geocoded."""
+    if tuning_profile is not None:
+        engine = get_tuned_engine(engine=engine, profile_name=tuning_profile)
+    add_geocode_output_columns_to_address_table(
+        engine=engine, schema_name=schema_name, table_name=table_name
+    )
+    rows_reset = reset_address_table_rows_for_regeocoding(
+        engine=engine,
+        schema_name=schema_name,
+        table_name=table_name,
+        states=states,
+        zips=zips,
+        include_newly_loaded_states=include_newly_loaded_states,
+        include_unmatched=include_unmatched,
+        include_stale_vintage=include_stale_vintage,
+        renormalize=renormalize,
+    )
+    if renormalize:
+        normalize_all_addresses_in_address_table(
+            engine=engine, schema_name=schema_name, table_name=table_name, batch_size=batch_size
+        )
+    geocode_all_addresses_in_normalized_address_table(
+        engine=engine, schema_name=schema_name, table_name=table_name, batch_size=batch_size
+    )
+    return rows_reset
+
+
+def read_geocoded_address_table_w_lat_longs(
+    engine: Engine,
+    schema_name: str = "user_data",
+    table_name: str = "address_table",
+    include_census_geographies: bool = False,
+) -> "gpd.GeoDataFrame":
+    # geopandas is imported on first use to keep it off the package's import path.
+    import geopandas as gpd
+
     srid = get_srid_of_column(
         engine=engine, schema_name=schema_name, table_name=table_name, column_name="geomout"
     )
+    census_geography_cols = ""
+    if include_census_geographies:
+        # Tables that haven't been enriched yet get all-NULL census geography columns.
+        table_cols = get_table_column_details(
+            engine=engine, schema_name=schema_name, table_name=table_name
+        )["column_name"].to_list()
+        census_geography_cols = "".join(
+            f"at.{col}, " if col in table_cols else f"NULL::varchar AS {col}, "
+            for col in CENSUS_GEOGRAPHY_COLUMNS
+        )
     geocoded_table_df = execute_result_returning_query(
         query=f"""
             SELECT
+                address_id,
                 full_address,
                 ST_X(ST_TRANSFORM(at.geomout,{srid})) AS longitude,
                 ST_Y(ST_TRANSFORM(at.geomout,{srid})) AS latitude,
+                {census_geography_cols}
                 at.geomout AS geometry
             FROM {schema_name}.{table_name} at;""",
         engine=engine,
@@ -402,9 +1401,12 @@ def ingest_normalize_and_geocode_addresses(
     table_name: str = "address_table",
     batch_size: int = 100,
     rating_threshold: int = 22,
+    tuning_profile: Optional[str] = None,
 ) -> None:
     """Loads a pd.Series of full addresses into the indicated table, normalizes addresses, and
-    geocodes those addresses."""
+    geocodes those addresses (with the named tuning profile's settings, if one is given)."""
+    if tuning_profile is not None:
+        engine = get_tuned_engine(engine=engine, profile_name=tuning_profile)
     setup_address_table_for_address_normalization(
         engine=engine, schema_name=schema_name, table_name=table_name
     )
@@ -424,13 +1426,15 @@ def geocode_addresses(
     engine: Engine,
     full_address_colname: str = "full_address",
     verbose: bool = True,
-) -> gpd.GeoDataFrame:
+) -> "gpd.GeoDataFrame":
     """Ingests, normalizes, and geocodes addresses in a DataFrame.
 
     The number of implementations will likely increase and more parameters will likely be
     added, but maintaining the current [df, full_address_colname, engine, verbose] interface
     will be a priority.
     """
+    import geopandas as gpd
+
     schema_name = "user_data"
     table_name = "address_table"
 
@@ -447,13 +1451,20 @@ def geocode_addresses(
     geocoded_addr_table_gdf = read_geocoded_address_table_w_lat_longs(
         engine=engine, schema_name=schema_name, table_name=table_name
     )
+    # Dictionary-encodes df's addresses against the (unique) addresses in the address table so
+    # the merge joins on integer codes rather than hashing and comparing address strings.
+    geocoded_addr_table_gdf["address_code"] = range(len(geocoded_addr_table_gdf))
+    address_codes = pd.Categorical(
+        df["full_address"], categories=geocoded_addr_table_gdf["full_address"]
+    ).codes
     geocoded_full_df = pd.merge(
-        left=df,
-        right=geocoded_addr_table_gdf,
+        left=df.assign(address_code=address_codes),
+        right=geocoded_addr_table_gdf.drop(columns="full_address"),
         how="left",
-        on="full_address",
+        on="address_code",
         suffixes=("_orig", "_geocoder"),
     )
+    geocoded_full_df = geocoded_full_df.drop(columns="address_code")
     geocoded_full_gdf = gpd.GeoDataFrame(geocoded_full_df, crs=f"epsg:4269")
     if verbose:
         total_rows = geocoded_full_gdf.shape[0]
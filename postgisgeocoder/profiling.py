@@ -0,0 +1,417 @@
+import time
+from typing import Callable, Dict, List, Optional
+
+import pandas as pd
+from sqlalchemy import text
+from sqlalchemy.engine.base import Connection, Engine
+from sqlalchemy.exc import DBAPIError
+
+from postgisgeocoder.db import execute_result_returning_query, execute_structural_command
+from postgisgeocoder.geocoding import (
+    QUERY_CANCELED_SQLSTATE,
+    get_batch_geocode_query,
+    get_batch_normalize_query,
+)
+from postgisgeocoder.tuning import get_tuned_engine
+
+LOCK_NOT_AVAILABLE_SQLSTATE = "55P03"
+PLAN_NODE_COLUMNS = [
+    "depth",
+    "node_type",
+    "relation",
+    "index",
+    "loops",
+    "rows",
+    "total_time_ms",
+    "self_time_ms",
+    "shared_hit_blocks",
+    "shared_read_blocks",
+    "self_shared_read_blocks",
+]
+
+
+def explain_analyze_statement(conn: Connection, query: str) -> Dict:
+    """Runs EXPLAIN (ANALYZE, BUFFERS) on a statement in conn's open transaction and returns the
+    JSON plan. The statement really executes (that's how ANALYZE measures it), so the caller
+    should roll that transaction back to leave any UPDATE without effect."""
+    result = conn.execute(text(f"EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) {query}"))
+    return result.scalar()[0]
+
+
+def _flatten_plan_node(plan_node: Dict, depth: int, plan_rows: List[Dict]) -> None:
+    child_nodes = plan_node.get("Plans", [])
+    total_time_ms = plan_node.get("Actual Total Time", 0) * plan_node.get("Actual Loops", 1)
+    children_total_time_ms = sum(
+        child.get("Actual Total Time", 0) * child.get("Actual Loops", 1) for child in child_nodes
+    )
+    shared_read_blocks = plan_node.get("Shared Read Blocks", 0)
+    children_shared_read_blocks = sum(child.get("Shared Read Blocks", 0) for child in child_nodes)
+    plan_rows.append(
+        {
+            "depth": depth,
+            "node_type": plan_node.get("Node Type"),
+            "relation": plan_node.get("Relation Name", plan_node.get("Function Name")),
+            "index": plan_node.get("Index Name"),
+            "loops": plan_node.get("Actual Loops"),
+            "rows": plan_node.get("Actual Rows"),
+            "total_time_ms": round(total_time_ms, 3),
+            "self_time_ms": round(max(total_time_ms - children_total_time_ms, 0), 3),
+            "shared_hit_blocks": plan_node.get("Shared Hit Blocks", 0),
+            "shared_read_blocks": shared_read_blocks,
+            "self_shared_read_blocks": max(shared_read_blocks - children_shared_read_blocks, 0),
+        }
+    )
+    for child_node in child_nodes:
+        _flatten_plan_node(plan_node=child_node, depth=depth + 1, plan_rows=plan_rows)
+
+
+def flatten_plan(explain_output: Dict) -> pd.DataFrame:
+    """Returns one row per node of an EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) plan, with the
+    node's own (ie excluding its children) time and buffer reads."""
+    plan_rows = []
+    _flatten_plan_node(plan_node=explain_output["Plan"], depth=0, plan_rows=plan_rows)
+    return pd.DataFrame(plan_rows, columns=PLAN_NODE_COLUMNS)
+
+
+def _sample_addresses(
+    engine: Engine, schema_name: str, table_name: str, sample_size: int, row_filter: str
+) -> pd.DataFrame:
+    return execute_result_returning_query(
+        query=f"""
+            SELECT address_id, full_address
+            FROM {schema_name}.{table_name}
+            WHERE {row_filter}
+            ORDER BY random()
+            LIMIT {sample_size};
+        """,
+        engine=engine,
+    )
+
+
+def _format_address_id_filter(address_ids: List[int]) -> str:
+    if len(address_ids) == 0:
+        return "false"
+    return f"address_id IN ({', '.join([str(address_id) for address_id in address_ids])})"
+
+
+def _explain_analyze_sampled_batch(
+    engine: Engine,
+    build_batch_query: Callable[[str], str],
+    schema_name: str,
+    table_name: str,
+    batch_size: int,
+    sample_filter: str,
+    lock_timeout_ms: int,
+    statement_timeout_ms: int,
+) -> Optional[Dict]:
+    # The sample is claimed with FOR UPDATE SKIP LOCKED in the same transaction as the EXPLAIN,
+    # so rows a live job is updating are skipped rather than waited on, and the live job can
+    # only wait on the sampled rows until the statement_timeout-bounded EXPLAIN rolls back.
+    with engine.connect() as conn:
+        transaction = conn.begin()
+        try:
+            conn.execute(text(f"SET LOCAL lock_timeout = {int(lock_timeout_ms)};"))
+            conn.execute(text(f"SET LOCAL statement_timeout = {int(statement_timeout_ms)};"))
+            address_ids = conn.execute(
+                text(
+                    f"""
+                    SELECT address_id
+                    FROM {schema_name}.{table_name}
+                    WHERE {sample_filter}
+                    ORDER BY random()
+                    LIMIT {batch_size}
+                    FOR UPDATE SKIP LOCKED;
+                """
+                )
+            ).scalars().all()
+            return explain_analyze_statement(
+                conn=conn, query=build_batch_query(_format_address_id_filter(address_ids))
+            )
+        except DBAPIError as err:
+            timeout_sqlstates = (QUERY_CANCELED_SQLSTATE, LOCK_NOT_AVAILABLE_SQLSTATE)
+            if getattr(err.orig, "pgcode", None) not in timeout_sqlstates:
+                raise
+            return None
+        finally:
+            transaction.rollback()
+
+
+def explain_sampled_batches(
+    engine: Engine,
+    schema_name: str = "user_data",
+    table_name: str = "address_table",
+    batch_size: int = 100,
+    n_sampled_batches: int = 3,
+    rating_threshold: int = 22,
+    lock_timeout_ms: int = 1000,
+    statement_timeout_ms: int = 120000,
+) -> Dict[str, pd.DataFrame]:
+    """Captures EXPLAIN (ANALYZE, BUFFERS) plans for the normalizing and geocoding batch
+    statements that the batch drivers run, each over n_sampled_batches random batches of rows.
+    Nothing is written to the table, and rows locked by a running job are left out of the
+    samples. A batch that hits lock_timeout_ms or statement_timeout_ms is reported with a
+    timed_out flag instead of a plan. Returns the per-batch timings ("batch_summaries") and the
+    nodes of every captured plan ("plan_nodes")."""
+    batch_query_builders = {
+        "normalize": (
+            lambda row_filter: get_batch_normalize_query(
+                schema_name=schema_name,
+                table_name=table_name,
+                batch_size=batch_size,
+                row_filter=row_filter,
+            ),
+            "true",
+        ),
+        "geocode": (
+            lambda row_filter: get_batch_geocode_query(
+                schema_name=schema_name,
+                table_name=table_name,
+                batch_size=batch_size,
+                rating_threshold=rating_threshold,
+                row_filter=row_filter,
+            ),
+            "streetname IS NOT NULL",
+        ),
+    }
+    batch_summaries = []
+    plan_nodes = []
+    for batch_num in range(n_sampled_batches):
+        for statement_name, (build_batch_query, sample_filter) in batch_query_builders.items():
+            explain_output = _explain_analyze_sampled_batch(
+                engine=engine,
+                build_batch_query=build_batch_query,
+                schema_name=schema_name,
+                table_name=table_name,
+                batch_size=batch_size,
+                sample_filter=sample_filter,
+                lock_timeout_ms=lock_timeout_ms,
+                statement_timeout_ms=statement_timeout_ms,
+            )
+            if explain_output is None:
+                explain_output = {}
+            batch_summaries.append(
+                {
+                    "statement": statement_name,
+                    "batch": batch_num,
+                    "timed_out": len(explain_output) == 0,
+                    "planning_time_ms": explain_output.get("Planning Time"),
+                    "execution_time_ms": explain_output.get("Execution Time"),
+                }
+            )
+            if len(explain_output) == 0:
+                continue
+            batch_plan_df = flatten_plan(explain_output=explain_output)
+            batch_plan_df.insert(0, "statement", statement_name)
+            batch_plan_df.insert(1, "batch", batch_num)
+            plan_nodes.append(batch_plan_df)
+    if len(plan_nodes) == 0:
+        plan_nodes = [pd.DataFrame(columns=["statement", "batch"] + PLAN_NODE_COLUMNS)]
+    return {
+        "batch_summaries": pd.DataFrame(batch_summaries),
+        "plan_nodes": pd.concat(plan_nodes, ignore_index=True),
+    }
+
+
+def time_sampled_addresses(
+    engine: Engine,
+    schema_name: str = "user_data",
+    table_name: str = "address_table",
+    sample_size: int = 50,
+    time_budget_ms: int = 30000,
+) -> pd.DataFrame:
+    """Separately times normalize_address() and geocode() for a random sample of normalized
+    addresses. Timings are measured client-side, so each includes one round trip to the
+    database. Each address runs under a statement_timeout of time_budget_ms, so a pathological
+    address is reported with timed_out set (and a total_ms of about time_budget_ms) instead of
+    hanging the profiler. Returns one row per address, slowest total first."""
+    full_table_name = f"{schema_name}.{table_name}"
+    sample_df = _sample_addresses(
+        engine=engine,
+        schema_name=schema_name,
+        table_name=table_name,
+        sample_size=sample_size,
+        row_filter="streetname IS NOT NULL",
+    )
+    address_timings = []
+    with engine.connect() as conn:
+        for address_id, full_address in zip(sample_df["address_id"], sample_df["full_address"]):
+            address_timing = {
+                "address_id": int(address_id),
+                "full_address": full_address,
+                "rating": None,
+                "timed_out": False,
+                "normalize_ms": None,
+                "geocode_ms": None,
+            }
+            start_time = time.perf_counter()
+            try:
+                with conn.begin():
+                    conn.execute(text(f"SET LOCAL statement_timeout = {int(time_budget_ms)};"))
+                    conn.execute(
+                        text(
+                            f"""
+                            SELECT normalize_address(full_address)
+                            FROM {full_table_name}
+                            WHERE address_id = :address_id;
+                        """
+                        ),
+                        {"address_id": int(address_id)},
+                    ).fetchall()
+                    normalize_time = time.perf_counter() - start_time
+                    address_timing["normalize_ms"] = round(1000 * normalize_time, 3)
+                    geocode_start_time = time.perf_counter()
+                    address_timing["rating"] = conn.execute(
+                        text(
+                            f"""
+                            SELECT MIN((g).rating) AS rating
+                            FROM (
+                                    SELECT (address, predirabbrev, streetname,
+                                            streettypeabbrev, postdirabbrev, internal,
+                                            location, stateabbrev, zip, parsed, zip4,
+                                            address_alphanumeric)::norm_addy AS addy
+                                    FROM {full_table_name}
+                                    WHERE address_id = :address_id
+                                ) AS a
+                                LEFT JOIN LATERAL
+                                geocode(a.addy) AS g
+                                ON true;
+                        """
+                        ),
+                        {"address_id": int(address_id)},
+                    ).scalar()
+                    geocode_time = time.perf_counter() - geocode_start_time
+                    address_timing["geocode_ms"] = round(1000 * geocode_time, 3)
+            except DBAPIError as err:
+                if getattr(err.orig, "pgcode", None) != QUERY_CANCELED_SQLSTATE:
+                    raise
+                address_timing["timed_out"] = True
+            address_timing["total_ms"] = round(1000 * (time.perf_counter() - start_time), 3)
+            address_timings.append(address_timing)
+    address_timings_df = pd.DataFrame(address_timings)
+    if len(address_timings_df) > 0:
+        address_timings_df = address_timings_df.sort_values(by="total_ms", ascending=False)
+    return address_timings_df.reset_index(drop=True)
+
+
+def database_has_pg_stat_statements(engine: Engine) -> bool:
+    extension_df = execute_result_returning_query(
+        query="SELECT COUNT(*) FROM pg_extension WHERE extname = 'pg_stat_statements';",
+        engine=engine,
+    )
+    return extension_df["count"].values[0] > 0
+
+
+def get_geocoding_pg_stat_statements(
+    engine: Engine, table_name: str = "address_table", n_top: int = 25
+) -> pd.DataFrame:
+    """Returns the pg_stat_statements entries for geocoding work (the batch statements and, if
+    pg_stat_statements.track = 'all', the TIGER lookups geocode() runs internally), most total
+    time first. Returns an empty DataFrame if pg_stat_statements isn't installed."""
+    if not database_has_pg_stat_statements(engine=engine):
+        return pd.DataFrame()
+    return execute_result_returning_query(
+        query=f"""
+            SELECT
+                calls,
+                round(total_exec_time::numeric, 3) AS total_exec_time_ms,
+                round(mean_exec_time::numeric, 3) AS mean_exec_time_ms,
+                rows,
+                shared_blks_hit,
+                shared_blks_read,
+                left(regexp_replace(query, '\\s+', ' ', 'g'), 200) AS query
+            FROM pg_stat_statements
+            WHERE query ~* '(tiger|geocode|normalize_address|norm_addy|{table_name})'
+            ORDER BY total_exec_time DESC
+            LIMIT {n_top};
+        """,
+        engine=engine,
+    )
+
+
+def write_profiling_report(report: Dict[str, pd.DataFrame], report_path: str) -> None:
+    with open(report_path, "w") as report_file:
+        for section_name, section_df in report.items():
+            report_file.write(f"## {section_name}\n\n")
+            if len(section_df) == 0:
+                report_file.write("(no data)\n\n")
+            else:
+                report_file.write(f"{section_df.to_string(index=False)}\n\n")
+
+
+def profile_batch_geocoding(
+    engine: Engine,
+    schema_name: str = "user_data",
+    table_name: str = "address_table",
+    batch_size: int = 100,
+    n_sampled_batches: int = 3,
+    address_sample_size: int = 50,
+    rating_threshold: int = 22,
+    n_top: int = 20,
+    tuning_profile: Optional[str] = None,
+    reset_pg_stat_statements: bool = False,
+    report_path: Optional[str] = None,
+    lock_timeout_ms: int = 1000,
+    batch_statement_timeout_ms: int = 120000,
+    address_time_budget_ms: int = 30000,
+) -> Dict[str, pd.DataFrame]:
+    """Profiles the batch normalizing/geocoding statements without modifying the address table.
+    Returns (and, if report_path is given, writes a report of) the:
+        batch_summaries:         planning and execution time of each sampled batch statement
+        slowest_plan_nodes:      plan nodes with the most self time across the sampled batches
+        buffer_miss_hot_spots:   relations/indexes with the most blocks read from outside cache
+        slowest_addresses:       per-address normalize_address() and geocode() timings
+        pg_stat_statements:      the geocoding-related entries of pg_stat_statements
+
+    For pg_stat_statements to break geocode() down into the TIGER lookups it runs, the server
+    needs pg_stat_statements in shared_preload_libraries and pg_stat_statements.track = 'all'
+    (the docker-compose setup does both). With reset_pg_stat_statements, its counters are
+    reset before profiling, so only this run's statements are reported.
+
+    It's safe to run alongside a geocoding job: sampled batches skip rows the job has locked,
+    give up after lock_timeout_ms waiting on a table lock, and hold their own sampled rows
+    for at most batch_statement_timeout_ms. Each sampled address gets address_time_budget_ms
+    (see time_sampled_addresses)."""
+    if tuning_profile is not None:
+        engine = get_tuned_engine(engine=engine, profile_name=tuning_profile)
+    if reset_pg_stat_statements and database_has_pg_stat_statements(engine=engine):
+        execute_structural_command(query="SELECT pg_stat_statements_reset();", engine=engine)
+    batch_profiles = explain_sampled_batches(
+        engine=engine,
+        schema_name=schema_name,
+        table_name=table_name,
+        batch_size=batch_size,
+        n_sampled_batches=n_sampled_batches,
+        rating_threshold=rating_threshold,
+        lock_timeout_ms=lock_timeout_ms,
+        statement_timeout_ms=batch_statement_timeout_ms,
+    )
+    plan_nodes_df = batch_profiles["plan_nodes"]
+    slowest_plan_nodes_df = plan_nodes_df.sort_values(by="self_time_ms", ascending=False)
+    buffer_miss_hot_spots_df = (
+        plan_nodes_df.loc[plan_nodes_df["relation"].notnull() | plan_nodes_df["index"].notnull()]
+        .groupby(["statement", "node_type", "relation", "index"], dropna=False)[
+            ["self_shared_read_blocks", "shared_hit_blocks", "self_time_ms"]
+        ]
+        .sum()
+        .reset_index()
+        .sort_values(by="self_shared_read_blocks", ascending=False)
+    )
+    address_timings_df = time_sampled_addresses(
+        engine=engine,
+        schema_name=schema_name,
+        table_name=table_name,
+        sample_size=address_sample_size,
+        time_budget_ms=address_time_budget_ms,
+    )
+    report = {
+        "batch_summaries": batch_profiles["batch_summaries"],
+        "slowest_plan_nodes": slowest_plan_nodes_df.head(n_top).reset_index(drop=True),
+        "buffer_miss_hot_spots": buffer_miss_hot_spots_df.head(n_top).reset_index(drop=True),
+        "slowest_addresses": address_timings_df.head(n_top),
+        "pg_stat_statements": get_geocoding_pg_stat_statements(
+            engine=engine, table_name=table_name, n_top=n_top
+        ),
+    }
+    if report_path is not None:
+        write_profiling_report(report=report, report_path=report_path)
+    return report
@@ -0,0 +1,225 @@
+from contextlib import contextmanager
+import time
+from typing import Dict, Iterator, Optional, Tuple
+from weakref import WeakKeyDictionary
+
+import pandas as pd
+from sqlalchemy import event
+from sqlalchemy.engine.base import Engine
+
+from postgisgeocoder.db import execute_result_returning_query, execute_structural_command
+
+# Named sets of PostgreSQL session settings (applied to every connection an engine opens) and
+# tiger.geocode_settings values. Note that tiger.geocode_settings is a table, so its values
+# apply database-wide rather than per connection; they're only applied inside an explicit
+# scoped_geocode_settings() block, never by get_tuned_engine.
+TUNING_PROFILES = {
+    "default": {"session_settings": {}, "geocode_settings": {}},
+    "bulk": {
+        "session_settings": {
+            "work_mem": "64MB",
+            "jit": "off",
+            "random_page_cost": "1.1",
+            "max_parallel_workers_per_gather": "0",
+            "synchronous_commit": "off",
+        },
+        "geocode_settings": {},
+    },
+    "interactive": {
+        "session_settings": {
+            "work_mem": "16MB",
+            "jit": "off",
+            "random_page_cost": "1.1",
+        },
+        "geocode_settings": {},
+    },
+}
+
+# Tuned engines, keyed on their source engine and then on profile name.
+_tuned_engines: "WeakKeyDictionary[Engine, Dict[str, Engine]]" = WeakKeyDictionary()
+
+
+def register_tuning_profile(
+    name: str,
+    session_settings: Dict[str, str],
+    geocode_settings: Optional[Dict[str, str]] = None,
+) -> None:
+    """Adds (or replaces) a named tuning profile."""
+    if geocode_settings is None:
+        geocode_settings = {}
+    TUNING_PROFILES[name] = {
+        "session_settings": session_settings,
+        "geocode_settings": geocode_settings,
+    }
+    for tuned_engines_by_profile in _tuned_engines.values():
+        if name in tuned_engines_by_profile:
+            tuned_engines_by_profile.pop(name).dispose()
+
+
+def _get_tuning_profile(profile_name: str) -> Dict:
+    if profile_name not in TUNING_PROFILES:
+        raise ValueError(
+            f"Unknown tuning profile: '{profile_name}'. "
+            + f"Valid profiles: {list(TUNING_PROFILES.keys())}"
+        )
+    return TUNING_PROFILES[profile_name]
+
+
+def apply_geocode_settings(engine: Engine, geocode_settings: Dict[str, str]) -> None:
+    """Sets tiger.geocode_settings values (database-wide) via set_geocode_setting()."""
+    if len(geocode_settings) == 0:
+        return
+    set_calls = ", ".join(
+        [f"set_geocode_setting('{name}', '{value}')" for name, value in geocode_settings.items()]
+    )
+    execute_structural_command(query=f"SELECT {set_calls};", engine=engine)
+
+
+@contextmanager
+def scoped_geocode_settings(engine: Engine, geocode_settings: Dict[str, str]) -> Iterator[None]:
+    """Applies tiger.geocode_settings values for the duration of a with-block and then restores
+    the values that were in place before it. As tiger.geocode_settings is a table, the values
+    apply to every connection to the database (including other jobs) while the block runs.
+
+        with scoped_geocode_settings(engine, TUNING_PROFILES["my_profile"]["geocode_settings"]):
+            geocode_address_table_w_fallback_cascade(engine=engine, tuning_profile="my_profile")
+    """
+    original_settings_df = execute_result_returning_query(
+        query="SELECT name, setting FROM tiger.geocode_settings;", engine=engine
+    )
+    original_settings = dict(zip(original_settings_df["name"], original_settings_df["setting"]))
+    apply_geocode_settings(engine=engine, geocode_settings=geocode_settings)
+    try:
+        yield
+    finally:
+        apply_geocode_settings(
+            engine=engine,
+            geocode_settings={
+                name: original_settings[name]
+                for name in geocode_settings
+                if name in original_settings
+            },
+        )
+
+
+def _copy_engine_w_own_pool(engine: Engine) -> Engine:
+    # engine.execution_options() would share (and writes through to) engine's pool, so the
+    # copy is built directly from a recreated pool (same class, size, and connect_args).
+    return type(engine)(
+        engine.pool.recreate(),
+        engine.dialect,
+        engine.url,
+        echo=engine.echo,
+        hide_parameters=engine.hide_parameters,
+        execution_options=engine.get_execution_options(),
+    )
+
+
+def get_tuned_engine(engine: Engine, profile_name: str) -> Engine:
+    """Returns a copy of engine (same dialect, connect_args, pool class and size, and execution
+    options) with its own connection pool, whose connections all have the named profile's
+    session settings applied when they're opened. engine's own pool and connections are left
+    untouched, as are the profile's tiger.geocode_settings (see scoped_geocode_settings).
+    Tuned engines are cached per source engine and profile, so repeated calls share one
+    connection pool."""
+    profile = _get_tuning_profile(profile_name)
+    tuned_engines_by_profile = _tuned_engines.setdefault(engine, {})
+    if profile_name not in tuned_engines_by_profile:
+        tuned_engine = _copy_engine_w_own_pool(engine)
+        session_settings = profile["session_settings"]
+
+        @event.listens_for(tuned_engine, "connect")
+        def apply_session_settings(dbapi_connection, connection_record):
+            if len(session_settings) == 0:
+                return
+            cursor = dbapi_connection.cursor()
+            for setting_name, setting_value in session_settings.items():
+                cursor.execute("SELECT set_config(%s, %s, false);", (setting_name, setting_value))
+            cursor.close()
+            dbapi_connection.commit()
+
+        tuned_engines_by_profile[profile_name] = tuned_engine
+    return tuned_engines_by_profile[profile_name]
+
+
+def get_session_settings(engine: Engine, setting_names: Tuple[str, ...]) -> pd.DataFrame:
+    """Returns the values a connection from engine has for the named session settings."""
+    formatted_names = ", ".join([f"'{name}'" for name in setting_names])
+    return execute_result_returning_query(
+        query=f"""
+            SELECT name, setting, unit, source
+            FROM pg_settings
+            WHERE name IN ({formatted_names});
+        """,
+        engine=engine,
+    )
+
+
+def _time_geocoding_sample(
+    engine: Engine, schema_name: str, table_name: str, sample_size: int
+) -> float:
+    start_time = time.perf_counter()
+    execute_result_returning_query(
+        query=f"""
+            SELECT COUNT((g).rating) AS matches
+            FROM (
+                    SELECT (address, predirabbrev, streetname, streettypeabbrev,
+                            postdirabbrev, internal, location, stateabbrev, zip, parsed, zip4,
+                            address_alphanumeric)::norm_addy AS addy
+                    FROM {schema_name}.{table_name}
+                    WHERE streetname IS NOT NULL
+                    ORDER BY address_id
+                    LIMIT {sample_size}
+                ) AS a
+                LEFT JOIN LATERAL
+                geocode(a.addy, 1) AS g
+                ON true;
+        """,
+        engine=engine,
+    )
+    return time.perf_counter() - start_time
+
+
+def calibrate_tuning_profiles(
+    engine: Engine,
+    profile_names: Tuple[str, ...] = ("default", "bulk", "interactive"),
+    schema_name: str = "user_data",
+    table_name: str = "address_table",
+    sample_size: int = 200,
+    n_repeats: int = 3,
+    verbose: bool = True,
+) -> pd.DataFrame:
+    """Geocodes the same sample of normalized addresses (read-only) under each tuning profile
+    and returns the best-of-n_repeats timings, fastest profile first. One untimed pass is run
+    first so that no profile is penalized for reading TIGER pages into cache. Each profile's
+    tiger.geocode_settings are only in place while that profile is timed."""
+    _time_geocoding_sample(
+        engine=engine, schema_name=schema_name, table_name=table_name, sample_size=sample_size
+    )
+    calibration_results = []
+    for profile_name in profile_names:
+        tuned_engine = get_tuned_engine(engine=engine, profile_name=profile_name)
+        geocode_settings = _get_tuning_profile(profile_name)["geocode_settings"]
+        with scoped_geocode_settings(engine=engine, geocode_settings=geocode_settings):
+            run_times = [
+                _time_geocoding_sample(
+                    engine=tuned_engine,
+                    schema_name=schema_name,
+                    table_name=table_name,
+                    sample_size=sample_size,
+                )
+                for _ in range(n_repeats)
+            ]
+        calibration_results.append(
+            {
+                "profile": profile_name,
+                "best_run_time_seconds": round(min(run_times), 4),
+                "ms_per_address": round(1000 * min(run_times) / sample_size, 3),
+            }
+        )
+    calibration_df = pd.DataFrame(calibration_results)
+    calibration_df = calibration_df.sort_values(by="best_run_time_seconds").reset_index(drop=True)
+    if verbose:
+        print(calibration_df.to_string(index=False))
+        print(f"Fastest profile: '{calibration_df.loc[0, 'profile']}'")
+    return calibration_df
@@ -1,19 +1,33 @@
-import os
-from typing import Dict, List, Union
-import yaml
+from difflib import SequenceMatcher
+import functools
+import time
+from typing import TYPE_CHECKING, List, Union
 
 import pandas as pd
-import psycopg2 as pg
-import shapely
-from sqlalchemy import create_engine, event
-from sqlalchemy.engine.url import URL
 from sqlalchemy.engine.base import Engine
 
+from postgisgeocoder.db import execute_result_returning_query, get_project_root_dir
 
-def get_project_root_dir() -> os.path:
-    root_dir = os.path.dirname(os.path.dirname(__file__))
-    assert os.path.basename(root_dir) == "postgis_geocoder"
-    return root_dir
+if TYPE_CHECKING:
+    import shapely
+
+# get_project_root_dir now lives in postgisgeocoder.db; it's re-exported here so existing
+# imports from postgisgeocoder.utils keep working.
+__all__ = [
+    "coerce_postgis_geom_valued_string_to_gpd_geom",
+    "decode_geom_valued_column_to_geometry_type",
+    "format_addresses_for_standardization",
+    "func_timer",
+    "geocode_addr",
+    "geocode_list_of_addresses",
+    "get_project_root_dir",
+    "get_standardized_address_df",
+    "similar",
+]
+
+
+def similar(a: str, b: str) -> float:
+    return SequenceMatcher(None, a, b).ratio()
 
 
 def format_addresses_for_standardization(df: pd.DataFrame, addr_col: str) -> str:
@@ -34,9 +48,12 @@ def func_timer(func):
     return wrapper_func_timer
 
 
-def coerce_postgis_geom_valued_string_to_gpd_geom(geom_str: str) -> shapely.geometry:
+def coerce_postgis_geom_valued_string_to_gpd_geom(geom_str: str) -> "shapely.geometry":
+    # shapely is imported on first use to keep it off the package's import path.
+    from shapely import wkb
+
     if geom_str is not None:
-        return shapely.wkb.loads(geom_str, hex=True)
+        return wkb.loads(geom_str, hex=True)
     else:
         return None
 
@@ -46,7 +63,7 @@ def decode_geom_valued_column_to_geometry_type(series: pd.Series) -> pd.Series:
 
 
 def get_standardized_address_df(
-    conn: pg.extensions.connection, formatted_addrs: str
+    conn: Engine, formatted_addrs: str
 ) -> pd.DataFrame:
     query = f"""
     WITH A(a) AS (
@@ -61,12 +78,12 @@ def get_standardized_address_df(
         ) As s FROM A
     ) AS X;
     """
-    results_df = execute_result_returning_query(query, conn)
+    results_df = execute_result_returning_query(query=query, engine=conn)
     return results_df
 
 
 def geocode_addr(
-    conn: pg.extensions.connection,
+    conn: Engine,
     addr_to_geocode: str,
     top_n: Union[int, None] = None,
     restrict_geom_query: Union[str, None] = None,
@@ -97,13 +114,13 @@ def geocode_addr(
         '{addr_to_geocode}'{top_n}{restrict_geom_query}
     ) As g;
     """
-    geocode_results_df = execute_result_returning_query(query, conn)
+    geocode_results_df = execute_result_returning_query(query=query, engine=conn)
     geocode_results_df["raw_address"] = addr_to_geocode
     return geocode_results_df
 
 
 def geocode_list_of_addresses(
-    conn: pg.extensions.connection,
+    conn: Engine,
     addrs_to_geocode: List[str],
     top_n: Union[int, None] = None,
     restrict_geom_query: Union[str, None] = None,